@@ -1,8 +1,92 @@
 from europi import *
 from europi_script import EuroPiScript
+from array import array
 import utime
 import random
 
+KNOB_POLL_MS = 100    # próbkowanie k2 (menu i edycja)
+UI_REFRESH_MS = 50    # minimalny odstęp między przerysowaniami OLED
+LOOP_SLEEP_MS = 5     # tempo pętli zegara i bramek
+
+GATE_OUTPUTS = [cv1, cv2, cv3, cv4, cv5, cv6]
+NUM_CHANNELS = 3      # liczba kanałów bramek (1..6), kolejne wyjścia od cv1
+GATE_VOLTAGE = 5
+GATE_MIN_MS = 10
+GATE_MAX_MS = 1000
+GLOBAL_ITEMS = 3      # Root, Range, Scale; dalej pozycje kanałów z tabeli
+CHANNEL_ROWS = 3      # ile wierszy kanałów mieści się pod nagłówkiem
+
+class DetentKnob:
+    # Zamienia odczyt gałki na zdarzenia zmiany pozycji 0..steps-1.
+    # Histereza (w ułamku odstępu między pozycjami) tłumi szum na granicy.
+    def __init__(self, knob, steps, hysteresis=0.35):
+        self.knob = knob
+        self.steps = steps
+        self.hysteresis = hysteresis
+        self.pos = None
+
+    def reset(self):
+        self.pos = None
+
+    def sample(self):
+        # Zwraca nową pozycję albo None, gdy nie było realnej zmiany
+        span = self.steps - 1
+        h = self.hysteresis
+        # Zakres rozciągnięty o histerezę, żeby skrajne pozycje były osiągalne
+        x = self.knob.percent() * (span + 2 * h) - h
+        if self.pos is None:
+            pos = int(x + 0.5)
+        else:
+            d = x - self.pos
+            if abs(d) < 0.5 + h:
+                return None
+            # Pozycja tuż za krawędzią pasma, więc wolny obrót trafia w każdą wartość
+            pos = int(x - h + 0.5) if d > 0 else int(x + h + 0.5)
+        pos = max(0, min(span, pos))
+        if pos == self.pos:
+            return None
+        self.pos = pos
+        return pos
+
+class GateEngine:
+    # Stan kanałów w równoległych tablicach; zegar to jeden przebieg po kanałach,
+    # a wygaszanie bramek pomija pętlę, gdy żadna nie jest otwarta.
+    def __init__(self, outputs, prob=50, length_ms=100):
+        self.outputs = outputs
+        self.count = len(outputs)
+        self.probs = array("B", [prob] * self.count)        # %
+        self.lens = array("H", [length_ms] * self.count)    # ms
+        self.deadlines = array("i", [0] * self.count)       # ticks_ms końca bramki
+        self.active = 0                                     # maska otwartych bramek
+
+    def clock(self, now):
+        outputs = self.outputs
+        probs = self.probs
+        lens = self.lens
+        deadlines = self.deadlines
+        rnd = random.random
+        active = 0
+        for ch in range(self.count):
+            if rnd() * 100 < probs[ch]:
+                outputs[ch].voltage(GATE_VOLTAGE)
+                deadlines[ch] = utime.ticks_add(now, lens[ch])
+                active |= 1 << ch
+            else:
+                outputs[ch].voltage(0)
+        self.active = active
+
+    def update(self, now):
+        active = self.active
+        if not active:
+            return
+        deadlines = self.deadlines
+        for ch in range(self.count):
+            bit = 1 << ch
+            if active & bit and utime.ticks_diff(now, deadlines[ch]) > 0:
+                self.outputs[ch].voltage(0)
+                active &= ~bit
+        self.active = active
+
 class SimpleBitGarden(EuroPiScript):
     def __init__(self):
         self.root_notes = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
@@ -17,19 +101,28 @@ class SimpleBitGarden(EuroPiScript):
         self.range_val = 8
         self.scale_idx = 0
 
-        self.gate_probs = [0.5, 0.5, 0.5]
-        self.gate_lens = [100, 100, 100]
-        self.menu_items = [
-            "Root", "Range", "Scale",
-            "G1%", "G2%", "G3%",
-            "G1ms", "G2ms", "G3ms"
-        ]
+        self.gates = GateEngine(GATE_OUTPUTS[:NUM_CHANNELS])
+        # Menu z tabeli kanałów: najpierw wszystkie %, potem wszystkie ms
+        self.menu_items = ["Root", "Range", "Scale"]
+        self.menu_items += [f"G{ch + 1}%" for ch in range(self.gates.count)]
+        self.menu_items += [f"G{ch + 1}ms" for ch in range(self.gates.count)]
         self.menu_idx = 0
-        self.gate_out = [cv1, cv2, cv3]
-        self.gate_state = [False, False, False]
-        self.gate_timer = [0, 0, 0]
+        self.row_offset = 0
         self.edit_mode = False
         self.edit_val = None
+
+        # Gałka menu i gałki edycji (pozycje + histereza osobno dla każdego parametru)
+        note_count = len(self.root_notes)
+        octave_count = self.octave_max - self.octave_min + 1
+        self.menu_knob = DetentKnob(k2, len(self.menu_items))
+        self.edit_knobs = [
+            DetentKnob(k2, note_count * octave_count),
+            DetentKnob(k2, self.range_max - self.range_min + 1),
+            DetentKnob(k2, len(self.scale_list)),
+        ]
+        self.edit_knobs += [DetentKnob(k2, 101, hysteresis=1.0) for _ in range(self.gates.count)]
+        self.edit_knobs += [DetentKnob(k2, GATE_MAX_MS - GATE_MIN_MS + 1, hysteresis=5.0) for _ in range(self.gates.count)]
+        self.menu_dirty = False
         self.draw_menu(force=True)
 
     def get_root_display(self, editing=False):
@@ -46,7 +139,32 @@ class SimpleBitGarden(EuroPiScript):
         else:
             return self.range_val
 
+    def channel_item(self, idx):
+        # Pozycja menu kanału -> (kolumna, kanał); kolumna 0 = %, 1 = ms
+        return divmod(idx - GLOBAL_ITEMS, self.gates.count)
+
+    def get_channel_value(self, idx):
+        col, ch = self.channel_item(idx)
+        return self.gates.probs[ch] if col == 0 else self.gates.lens[ch]
+
+    def channel_item_text(self, idx, suffix):
+        selected = self.menu_idx == idx
+        marker = (">>" if self.edit_mode else ">") if selected else " "
+        value = self.edit_val if self.edit_mode and selected else self.get_channel_value(idx)
+        return f"{marker}{value}{suffix}"
+
+    def scroll_to_selection(self):
+        # Przewiń wiersze kanałów tak, żeby wybrany kanał był widoczny
+        if self.menu_idx < GLOBAL_ITEMS:
+            return
+        _, ch = self.channel_item(self.menu_idx)
+        if ch < self.row_offset:
+            self.row_offset = ch
+        elif ch >= self.row_offset + CHANNEL_ROWS:
+            self.row_offset = ch - CHANNEL_ROWS + 1
+
     def draw_menu(self, force=False):
+        self.menu_dirty = False
         oled.fill(0)
         # ---- PIERWSZY WIERSZ ----
         oled.text("scl:", 0, 0)
@@ -84,72 +202,48 @@ class SimpleBitGarden(EuroPiScript):
         else:
             oled.text(self.scale_list[self.scale_idx], scale_x, 0)
             
-        # ----------- POZOSTAŁE WIERSZE --------------------
-        y = 9
-        marker_p = ">>" if self.edit_mode and self.menu_idx == 3 else (">" if self.menu_idx == 3 else " ")
-        prob_txt = f"{marker_p}{int(self.edit_val*100) if self.edit_mode and self.menu_idx==3 else int(self.gate_probs[0]*100)}%"
-        marker_l = ">>" if self.edit_mode and self.menu_idx == 6 else (">" if self.menu_idx == 6 else " ")
-        len_txt = f"{marker_l}{self.edit_val if self.edit_mode and self.menu_idx==6 else self.gate_lens[0]}ms"
-        oled.text("G1:", 0, y)
-        oled.text(prob_txt, 28, y)
-        oled.text(len_txt, 78, y)
-        y = 17
-        marker_p = ">>" if self.edit_mode and self.menu_idx == 4 else (">" if self.menu_idx == 4 else " ")
-        prob_txt = f"{marker_p}{int(self.edit_val*100) if self.edit_mode and self.menu_idx==4 else int(self.gate_probs[1]*100)}%"
-        marker_l = ">>" if self.edit_mode and self.menu_idx == 7 else (">" if self.menu_idx == 7 else " ")
-        len_txt = f"{marker_l}{self.edit_val if self.edit_mode and self.menu_idx==7 else self.gate_lens[1]}ms"
-        oled.text("G2:", 0, y)
-        oled.text(prob_txt, 28, y)
-        oled.text(len_txt, 78, y)
-        y = 25
-        marker_p = ">>" if self.edit_mode and self.menu_idx == 5 else (">" if self.menu_idx == 5 else " ")
-        prob_txt = f"{marker_p}{int(self.edit_val*100) if self.edit_mode and self.menu_idx==5 else int(self.gate_probs[2]*100)}%"
-        marker_l = ">>" if self.edit_mode and self.menu_idx == 8 else (">" if self.menu_idx == 8 else " ")
-        len_txt = f"{marker_l}{self.edit_val if self.edit_mode and self.menu_idx==8 else self.gate_lens[2]}ms"
-        oled.text("G3:", 0, y)
-        oled.text(prob_txt, 28, y)
-        oled.text(len_txt, 78, y)
+        # ----------- WIERSZE KANAŁÓW (z tabeli) --------------------
+        self.scroll_to_selection()
+        count = self.gates.count
+        for row in range(min(CHANNEL_ROWS, count - self.row_offset)):
+            ch = self.row_offset + row
+            y = 9 + row * 8
+            oled.text(f"G{ch + 1}:", 0, y)
+            oled.text(self.channel_item_text(GLOBAL_ITEMS + ch, "%"), 28, y)
+            oled.text(self.channel_item_text(GLOBAL_ITEMS + count + ch, "ms"), 78, y)
         oled.show()
 
+    def detent_value(self, menu_idx, pos):
+        # Pozycja gałki -> wartość parametru
+        if menu_idx == 0:
+            note_count = len(self.root_notes)
+            return (pos % note_count, self.octave_min + pos // note_count)
+        elif menu_idx == 1:
+            return self.range_min + pos
+        elif menu_idx == 2:
+            return pos
+        elif self.channel_item(menu_idx)[0] == 0:
+            return pos
+        else:
+            return GATE_MIN_MS + pos
+
     def update_menu(self):
+        # Rysowanie odbywa się w pętli głównej, tu tylko zdarzenia zmian
         if not self.edit_mode:
-            idx = k2.range(len(self.menu_items))
-            if idx != self.menu_idx:
+            idx = self.menu_knob.sample()
+            if idx is not None and idx != self.menu_idx:
                 self.menu_idx = idx
-                self.draw_menu(force=True)
+                self.menu_dirty = True
         else:
-            k2v = k2.percent()
-            if self.menu_idx == 0:
-                note_count = len(self.root_notes)
-                total = note_count * (self.octave_max - self.octave_min + 1)
-                idx = int(k2v * (total - 1) + 0.5)
-                note_idx = idx % note_count
-                octave = idx // note_count
-                # Zmień tylko root (range zostaje, dopiero po zatwierdzeniu robimy korektę)
-                if self.edit_val != (note_idx, octave):
-                    self.edit_val = (note_idx, octave)
-                    self.draw_menu(force=True)
-            elif self.menu_idx == 1:
-                # Edycja range: int 1..8
-                range_val = int(self.range_min + k2v * (self.range_max - self.range_min) + 0.5)
-                if self.edit_val != range_val:
-                    self.edit_val = range_val
-                    self.draw_menu(force=True)
-            elif self.menu_idx == 2:
-                new_idx = int(k2v * (len(self.scale_list) - 1) + 0.5)
-                if self.edit_val != new_idx:
-                    self.edit_val = new_idx
-                    self.draw_menu(force=True)
-            elif 3 <= self.menu_idx <= 5:
-                new_val = round(k2v, 2)
-                if self.edit_val != new_val:
-                    self.edit_val = new_val
-                    self.draw_menu(force=True)
-            elif 6 <= self.menu_idx <= 8:
-                new_len = int(10 + k2v * 990)
-                if self.edit_val != new_len:
-                    self.edit_val = new_len
-                    self.draw_menu(force=True)
+            pos = self.edit_knobs[self.menu_idx].sample()
+            if pos is not None:
+                self.on_edit_change(self.detent_value(self.menu_idx, pos))
+
+    def on_edit_change(self, value):
+        # Zmień tylko edytowaną wartość (range zostaje, dopiero po zatwierdzeniu robimy korektę)
+        if self.edit_val != value:
+            self.edit_val = value
+            self.menu_dirty = True
 
     def handle_b2(self):
         if not self.edit_mode:
@@ -159,12 +253,11 @@ class SimpleBitGarden(EuroPiScript):
                 self.edit_val = self.range_val
             elif self.menu_idx == 2:
                 self.edit_val = self.scale_idx
-            elif 3 <= self.menu_idx <= 5:
-                self.edit_val = self.gate_probs[self.menu_idx - 3]
-            elif 6 <= self.menu_idx <= 8:
-                self.edit_val = self.gate_lens[self.menu_idx - 6]
+            else:
+                self.edit_val = self.get_channel_value(self.menu_idx)
+            self.edit_knobs[self.menu_idx].reset()
             self.edit_mode = True
-            self.draw_menu(force=True)
+            self.menu_dirty = True
         else:
             if self.menu_idx == 0:
                 self.root_note_idx, self.root_octave = self.edit_val
@@ -176,42 +269,30 @@ class SimpleBitGarden(EuroPiScript):
                 self.root_octave = max(self.octave_min, min(self.octave_max, 8 - self.range_val))
             elif self.menu_idx == 2:
                 self.scale_idx = self.edit_val
-            elif 3 <= self.menu_idx <= 5:
-                self.gate_probs[self.menu_idx - 3] = self.edit_val
-            elif 6 <= self.menu_idx <= 8:
-                self.gate_lens[self.menu_idx - 6] = self.edit_val
+            else:
+                col, ch = self.channel_item(self.menu_idx)
+                if col == 0:
+                    self.gates.probs[ch] = self.edit_val
+                else:
+                    self.gates.lens[ch] = self.edit_val
             self.edit_mode = False
             self.edit_val = None
-            self.draw_menu(force=True)
+            self.menu_dirty = True
 
     def handle_clock(self):
-        for ch in range(3):
-            if random.random() < self.gate_probs[ch]:
-                self.gate_out[ch].voltage(5)
-                self.gate_state[ch] = True
-                self.gate_timer[ch] = utime.ticks_add(utime.ticks_ms(), self.gate_lens[ch])
-            else:
-                self.gate_out[ch].voltage(0)
-                self.gate_state[ch] = False
+        self.gates.clock(utime.ticks_ms())
 
     def update_gates(self):
-        now = utime.ticks_ms()
-        for ch in range(3):
-            if self.gate_state[ch] and utime.ticks_diff(now, self.gate_timer[ch]) > 0:
-                self.gate_out[ch].voltage(0)
-                self.gate_state[ch] = False
+        self.gates.update(utime.ticks_ms())
 
     def main(self):
         last_clock = False
         last_menu_update = utime.ticks_ms()
+        last_draw = last_menu_update
         last_b2 = b2.value()
         while True:
-            now = utime.ticks_ms()
-            if utime.ticks_diff(now, last_menu_update) > 100:
-                self.update_menu()
-                last_menu_update = now
-
-            clk = bool(din.value)
+            # Ścieżka zegara jest pierwsza i nie czeka na UI
+            clk = bool(din.value())
             if clk and not last_clock:
                 self.handle_clock()
             last_clock = clk
@@ -221,8 +302,17 @@ class SimpleBitGarden(EuroPiScript):
                 self.handle_b2()
             last_b2 = curr_b2
 
+            now = utime.ticks_ms()
+            if utime.ticks_diff(now, last_menu_update) > KNOB_POLL_MS:
+                self.update_menu()
+                last_menu_update = now
+
+            if self.menu_dirty and utime.ticks_diff(now, last_draw) >= UI_REFRESH_MS:
+                self.draw_menu()
+                last_draw = now
+
             self.update_gates()
-            utime.sleep_ms(5)
+            utime.sleep_ms(LOOP_SLEEP_MS)
 
 script = SimpleBitGarden()
 if __name__ == "__main__":
@@ -8,6 +8,7 @@ from experimental.math_extras import solve_linear_system
 from experimental.screensaver import OledWithScreensaver
 
 import configuration
+import framebuf
 import math
 import random
 import time
@@ -21,6 +22,51 @@ MAX_FREQUENCY = 1.0
 
 ssoled = OledWithScreensaver()
 
+# --- Pola tekstowe OLED z pamięcią zrasteryzowanych napisów ---
+TEXT_CACHE_SIZE = 4   # ile ostatnich wartości pola trzymamy zrasteryzowanych
+
+class TextField:
+    # Kluczem jest wartość po kwantyzacji (int), więc gdy nic się nie zmieniło,
+    # nie powstaje nowy napis ani nowa rasteryzacja, tylko blit gotowego paska.
+    # Paski to stała pula alokowana raz: nowa wartość nadpisuje najstarszy pasek.
+    def __init__(self, x, y, chars, scale, formatter):
+        self.x = x
+        self.y = y
+        self.width = chars * CHAR_WIDTH
+        self.scale = scale
+        self.formatter = formatter
+        self.strips = [
+            framebuf.FrameBuffer(bytearray(self.width * CHAR_HEIGHT // 8), self.width, CHAR_HEIGHT, framebuf.MONO_VLSB)
+            for _ in range(TEXT_CACHE_SIZE)
+        ]
+        self.keys = [None] * TEXT_CACHE_SIZE
+        self.next_slot = 0
+        self.key = None
+        self.strip = None
+
+    def draw(self, display, value):
+        key = int(round(value * self.scale))
+        if key != self.key:
+            strip = None
+            for i in range(TEXT_CACHE_SIZE):
+                if self.keys[i] == key:
+                    strip = self.strips[i]
+                    break
+            if strip is None:
+                strip = self.render(key)
+            self.key = key
+            self.strip = strip
+        display.blit(self.strip, self.x, self.y, 0)
+
+    def render(self, key):
+        slot = self.next_slot
+        self.next_slot = (slot + 1) % TEXT_CACHE_SIZE
+        strip = self.strips[slot]
+        strip.fill(0)
+        strip.text(self.formatter(key / self.scale), 0, 0, 1)
+        self.keys[slot] = key
+        return strip
+
 CLIP_MODE_LIMIT = 0
 CLIP_MODE_FOLD = 1
 CLIP_MODE_THRU = 2
@@ -30,6 +76,99 @@ CLIP_MODE_NAMES = [
     "Thru"
 ]
 
+# --- Stopień clip/fold/wrap ---
+# Dowolna liczba przekroczeń w stałym czasie (arytmetyka modulo, bez pętli)
+VOLTAGE_SPAN = MAX_VOLTAGE - MIN_VOLTAGE
+
+def clip_limit(v):
+    if v < MIN_VOLTAGE:
+        return MIN_VOLTAGE
+    elif v > MAX_VOLTAGE:
+        return MAX_VOLTAGE
+    else:
+        return v
+
+def clip_fold(v):
+    if MIN_VOLTAGE <= v <= MAX_VOLTAGE:
+        return v
+    # Fala trójkątna o okresie 2*span: każde odbicie od granicy odwraca kierunek
+    x = (v - MIN_VOLTAGE) % (2 * VOLTAGE_SPAN)
+    if x > VOLTAGE_SPAN:
+        x = 2 * VOLTAGE_SPAN - x
+    return MIN_VOLTAGE + x
+
+def clip_thru(v):
+    if MIN_VOLTAGE <= v <= MAX_VOLTAGE:
+        return v
+    return MIN_VOLTAGE + (v - MIN_VOLTAGE) % VOLTAGE_SPAN
+
+CLIP_FUNCTIONS = [
+    clip_limit,
+    clip_fold,
+    clip_thru
+]
+
+def clip_block(samples, clip_mode):
+    # Przetwarza cały blok próbek w miejscu; tryb wybierany raz na blok
+    clip = CLIP_FUNCTIONS[clip_mode]
+    for i in range(len(samples)):
+        samples[i] = clip(samples[i])
+    return samples
+
+# --- Zegar kroków bez dryfu ---
+# Polityki nadrabiania zaległych kroków, gdy pętla nie nadąża
+CATCHUP_SKIP = 0     # jeden krok, pominięte terminy przepadają (siatka czasu zostaje)
+CATCHUP_BURST = 1    # każdy kolejny przebieg pętli odpala jeden zaległy krok
+CATCHUP_MAX_STEPS = 4  # przy większej zaległości BURST zachowuje się jak SKIP
+STEP_CATCHUP = CATCHUP_SKIP  # polityka używana przez ten skrypt
+
+class StepClock:
+    def __init__(self, frequency, policy=CATCHUP_SKIP):
+        self.policy = policy
+        self.period_ms = 1000.0 / frequency
+        # Początek bieżącego okresu: część całkowita w tickach + ułamek ms
+        self.anchor = time.ticks_ms()
+        self.anchor_frac = 0.0
+
+    def elapsed(self, now):
+        return time.ticks_diff(now, self.anchor) - self.anchor_frac
+
+    def phase(self, now):
+        p = self.elapsed(now) / self.period_ms
+        return p if p < 1.0 else 1.0
+
+    def set_frequency(self, frequency, now):
+        period_ms = 1000.0 / frequency
+        if period_ms == self.period_ms:
+            return
+        # Zmiana w trakcie okresu: zachowaj fazę, przeskaluj czas od początku okresu
+        self._set_anchor(now, self.elapsed(now) / self.period_ms * period_ms)
+        self.period_ms = period_ms
+
+    def poll(self, now):
+        # Termin przesuwa się o pełny okres (next = next + period), a nie do `now`,
+        # więc opóźnienie pętli nie kumuluje się w częstotliwości
+        elapsed = self.elapsed(now)
+        if elapsed < self.period_ms:
+            return False
+        due = int(elapsed / self.period_ms)
+        if self.policy == CATCHUP_BURST and due <= CATCHUP_MAX_STEPS:
+            self._advance(1)
+        else:
+            self._advance(due)
+        return True
+
+    def _advance(self, steps):
+        frac = self.anchor_frac + steps * self.period_ms
+        whole = int(frac)
+        self.anchor = time.ticks_add(self.anchor, whole)
+        self.anchor_frac = frac - whole
+
+    def _set_anchor(self, now, elapsed):
+        whole = math.ceil(elapsed)
+        self.anchor = time.ticks_add(now, -whole)
+        self.anchor_frac = whole - elapsed
+
 class Point2D:
     def __init__(self, x, y):
         self.x = x
@@ -38,20 +177,33 @@ class Point2D:
 def linear_interpolate(x1, x2, t):
     return x1 * (1-t) + x2 * t
 
+def cubic_at(coeffs, t):
+    return coeffs[0] * t**3 + coeffs[1] * t**2 + coeffs[2] * t + coeffs[3]
+
 class BezierCurve:
     def __init__(self):
         self.origin = Point2D(0, 0)
         self.next_point = Point2D(1, 0)
+        self.coeffs = None
+        self.coeffs_k = None
 
     def set_next_value(self, y):
         self.origin.y = self.next_point.y
         self.next_point.y = y
+        self.coeffs = None
 
-    def value_at(self, t, k):
-        p1 = self.interpolate(0, k)
-        p2 = self.interpolate(1/3, k)
-        p3 = self.interpolate(2/3, k)
-        p4 = self.interpolate(1, k)
+    def coefficients(self, k):
+        # Współczynniki liczone raz na segment i k, a nie w każdej próbce
+        if self.coeffs is None or k != self.coeffs_k:
+            self.coeffs = self.segment_coefficients(self.origin, self.next_point, k)
+            self.coeffs_k = k
+        return self.coeffs
+
+    def segment_coefficients(self, start, end, k):
+        p1 = self.interpolate(0, k, start, end)
+        p2 = self.interpolate(1/3, k, start, end)
+        p3 = self.interpolate(2/3, k, start, end)
+        p4 = self.interpolate(1, k, start, end)
 
         m = [
             [p1.x**3, p1.x**2, p1.x, 1, p1.y],
@@ -59,14 +211,18 @@ class BezierCurve:
             [p3.x**3, p3.x**2, p3.x, 1, p3.y],
             [p4.x**3, p4.x**2, p4.x, 1, p4.y],
         ]
-        coeffs = solve_linear_system(m)
-        return coeffs[0] * t**3 + coeffs[1] * t**2 + coeffs[2] * t + coeffs[3]
+        return solve_linear_system(m)
 
-    def interpolate(self, t, k):
-        p0 = self.origin
+    def value_at(self, t, k):
+        return cubic_at(self.coefficients(k), t)
+
+    def interpolate(self, t, k, p0=None, p3=None):
+        if p0 is None:
+            p0 = self.origin
+        if p3 is None:
+            p3 = self.next_point
         p1 = Point2D(0,0)
         p2 = Point2D(0,0)
-        p3 = self.next_point
 
         if k <= 0:
             p1.x = p0.x - k/3
@@ -120,63 +276,86 @@ class OutputChannel:
         self.curve_in = curve_in
         self.voltage_out = 0
         self.cv_out.off()
-        self.last_tick_at = time.ticks_ms()
+        self.clock = StepClock(MIN_FREQUENCY, STEP_CATCHUP)
+        # Następny cel losowany z wyprzedzeniem, żeby podgląd znał kolejny segment
+        self.upcoming_value = random.random() * 1.2 - 0.1
+        self.segment = 0
         self.change_voltage()
         self.frequency = 0.0
         self.curve_k = 0.0
+        self.phase = 0.0
         self.voltage_out = 0.0
-        self.vizualization_samples = []
+        self.set_clip_mode(CLIP_MODE_LIMIT)
 
     def change_voltage(self):
-        self.curve.set_next_value(random.random() * 1.2 - 0.1)
+        self.curve.set_next_value(self.upcoming_value)
+        self.upcoming_value = random.random() * 1.2 - 0.1
+        self.segment += 1
 
     def update(self, clip_mode=CLIP_MODE_LIMIT):
+        if clip_mode != self.clip_mode:
+            self.set_clip_mode(clip_mode)
         now = time.ticks_ms()
         self.curve_k = self.curve_in.percent() * 2 - 1
         self.frequency = self.frequency_in.percent() * (MAX_FREQUENCY - MIN_FREQUENCY) + MIN_FREQUENCY
-        t = 1000.0/self.frequency
-        elapsed_ms = time.ticks_diff(now, self.last_tick_at)
-        if elapsed_ms >= t:
+        self.clock.set_frequency(self.frequency, now)
+        if self.clock.poll(now):
             self.change_voltage()
-            self.last_tick_at = now
-            elapsed_ms = 0
-        self.voltage_out = self.curve.value_at(elapsed_ms / t, self.curve_k) * (MAX_VOLTAGE - MIN_VOLTAGE) + MIN_VOLTAGE
+        self.phase = self.clock.phase(now)
+        self.voltage_out = self.curve.value_at(self.phase, self.curve_k) * (MAX_VOLTAGE - MIN_VOLTAGE) + MIN_VOLTAGE
 
-        if clip_mode == CLIP_MODE_LIMIT:
-            self.voltage_out = self.clip_limit(self.voltage_out)
-        elif clip_mode == CLIP_MODE_FOLD:
-            self.voltage_out = self.clip_fold(self.voltage_out)
-        elif clip_mode == CLIP_MODE_THRU:
-            self.voltage_out = self.clip_thru(self.voltage_out)
+        self.voltage_out = self.clip(self.voltage_out)
 
         self.cv_out.voltage(self.voltage_out)
-        self.vizualization_samples.append(int((self.voltage_out - MIN_VOLTAGE) / (MAX_VOLTAGE - MIN_VOLTAGE) * OLED_HEIGHT/3))
-        if len(self.vizualization_samples) > OLED_WIDTH:
-            self.vizualization_samples.pop(0)
-
-    def clip_limit(self, v):
-        if v < MIN_VOLTAGE:
-            return MIN_VOLTAGE
-        elif v > MAX_VOLTAGE:
-            return MAX_VOLTAGE
-        else:
-            return v
 
-    def clip_fold(self, v):
-        if v < MIN_VOLTAGE:
-            return MIN_VOLTAGE - v
-        elif v > MAX_VOLTAGE:
-            return MAX_VOLTAGE + (MAX_VOLTAGE - v)
-        else:
-            return v
+    def set_clip_mode(self, clip_mode):
+        # Wybór funkcji tylko przy zmianie trybu, nie w każdej próbce
+        self.clip_mode = clip_mode
+        self.clip = CLIP_FUNCTIONS[clip_mode]
 
-    def clip_thru(self, v):
-        if v < MIN_VOLTAGE:
-            return MAX_VOLTAGE - (MIN_VOLTAGE - v)
-        elif v > MAX_VOLTAGE:
-            return MIN_VOLTAGE - (MAX_VOLTAGE - v)
-        else:
-            return v
+# --- Podgląd krzywej liczony ze współczynników, bez historii próbek ---
+PREVIEW_HEIGHT = OLED_HEIGHT // 3
+PREVIEW_STRIP_HEIGHT = 16                # pasek framebuf (wielokrotność 8 dla MONO_VLSB)
+PREVIEW_Y = OLED_HEIGHT - PREVIEW_STRIP_HEIGHT
+SEGMENT_WIDTH = OLED_WIDTH // 2          # bieżący segment po lewej, następny po prawej
+PREVIEW_K_STEPS = 50                     # kwantyzacja k, żeby szum gałki nie wymuszał przeliczeń
+
+class CurvePreview:
+    def __init__(self):
+        self.strip = framebuf.FrameBuffer(bytearray(OLED_WIDTH * PREVIEW_STRIP_HEIGHT // 8), OLED_WIDTH, PREVIEW_STRIP_HEIGHT, framebuf.MONO_VLSB)
+        self.samples = [0.0] * SEGMENT_WIDTH   # blok próbek jednego segmentu, alokowany raz
+        self.key = None
+
+    def update(self, channel):
+        # Przeliczenie tylko przy nowym segmencie, zmianie k albo trybu clip
+        key = (channel.segment, int(round(channel.curve_k * PREVIEW_K_STEPS)), channel.clip_mode)
+        if key == self.key:
+            return
+        self.key = key
+        curve = channel.curve
+        # Bieżący segment: te same współczynniki, których używa wyjście (z pamięci krzywej)
+        current = curve.coefficients(channel.curve_k)
+        # Następny segment nie jest jeszcze w pamięci krzywej: jedno rozwiązanie na przerysowanie
+        upcoming = curve.segment_coefficients(Point2D(0, curve.next_point.y), Point2D(1, channel.upcoming_value), channel.curve_k)
+        self.strip.fill(0)
+        self.plot(current, 0, channel.clip_mode)
+        self.plot(upcoming, SEGMENT_WIDTH, channel.clip_mode)
+
+    def plot(self, coeffs, x0, clip_mode):
+        samples = self.samples
+        for x in range(SEGMENT_WIDTH):
+            samples[x] = cubic_at(coeffs, x / SEGMENT_WIDTH) * (MAX_VOLTAGE - MIN_VOLTAGE) + MIN_VOLTAGE
+        # Cały segment przez stopień clip jednym blokiem
+        clip_block(samples, clip_mode)
+        for x in range(SEGMENT_WIDTH):
+            y = int((samples[x] - MIN_VOLTAGE) / (MAX_VOLTAGE - MIN_VOLTAGE) * PREVIEW_HEIGHT)
+            self.strip.pixel(x0 + x, PREVIEW_STRIP_HEIGHT - 1 - y, 1)
+
+    def draw(self, display, channel):
+        self.update(channel)
+        display.blit(self.strip, 0, PREVIEW_Y, 0)
+        # Kursor: bieżąca pozycja w segmencie
+        display.vline(int(channel.phase * SEGMENT_WIDTH), OLED_HEIGHT - PREVIEW_HEIGHT - 1, PREVIEW_HEIGHT + 1, 1)
 
 class BezierSingle(EuroPiScript):
     def __init__(self):
@@ -187,6 +366,10 @@ class BezierSingle(EuroPiScript):
         self.clip_mode = cfg.get("clip_mode", CLIP_MODE_LIMIT)
         self.settings_dirty = False
         self.curve = OutputChannel(self.frequency_in["main"], self.curve_in["main"], cv1)
+        self.freq_field = TextField(1, 1, 8, 100, lambda f: f"F {f:0.2f}Hz")
+        self.k_field = TextField(1 + 10*CHAR_WIDTH, 1, 7, 100, lambda k: f"K {k:+0.2f}")
+        self.clip_field = TextField(1, CHAR_HEIGHT+2, 5, 1, lambda i: CLIP_MODE_NAMES[int(i)])
+        self.preview = CurvePreview()
 
         @b1.handler
         def on_b1_press():
@@ -201,10 +384,6 @@ class BezierSingle(EuroPiScript):
         self.save_state_json(cfg)
         self.settings_dirty = False
 
-    def draw_graph(self, curve):
-        for i in range(len(curve.vizualization_samples)):
-            ssoled.pixel(i, OLED_HEIGHT - 1 - curve.vizualization_samples[i], 1)
-
     def main(self):
         UI_DEADZONE = 0.01
         prev_freq_value = self.frequency_in["main"].percent()
@@ -222,9 +401,10 @@ class BezierSingle(EuroPiScript):
             prev_curve_value = current_curve_value
 
             ssoled.fill(0)
-            ssoled.text(f"F {self.curve.frequency:0.2f}Hz  K {self.curve.curve_k:+0.2f}", 1, 1, 1)
-            ssoled.text(CLIP_MODE_NAMES[self.clip_mode], 1, CHAR_HEIGHT+2, 1)
-            self.draw_graph(self.curve)
+            self.freq_field.draw(ssoled, self.curve.frequency)
+            self.k_field.draw(ssoled, self.curve.curve_k)
+            self.clip_field.draw(ssoled, self.clip_mode)
+            self.preview.draw(ssoled, self.curve)
             ssoled.show()
 
 if __name__ == "__main__":
@@ -4,6 +4,7 @@ from europi import *
 from europi_script import EuroPiScript
 from experimental.knobs import *
 from experimental.screensaver import OledWithScreensaver
+import framebuf
 import math
 import time
 
@@ -29,6 +30,51 @@ MAX_OUTPUT_VOLTAGE = 10.0
 
 ssoled = OledWithScreensaver()
 
+# --- Pola tekstowe OLED z pamięcią zrasteryzowanych napisów ---
+TEXT_CACHE_SIZE = 4   # ile ostatnich wartości pola trzymamy zrasteryzowanych
+
+class TextField:
+    # Kluczem jest wartość po kwantyzacji (int), więc gdy nic się nie zmieniło,
+    # nie powstaje nowy napis ani nowa rasteryzacja, tylko blit gotowego paska.
+    # Paski to stała pula alokowana raz: nowa wartość nadpisuje najstarszy pasek.
+    def __init__(self, x, y, chars, scale, formatter):
+        self.x = x
+        self.y = y
+        self.width = chars * CHAR_WIDTH
+        self.scale = scale
+        self.formatter = formatter
+        self.strips = [
+            framebuf.FrameBuffer(bytearray(self.width * CHAR_HEIGHT // 8), self.width, CHAR_HEIGHT, framebuf.MONO_VLSB)
+            for _ in range(TEXT_CACHE_SIZE)
+        ]
+        self.keys = [None] * TEXT_CACHE_SIZE
+        self.next_slot = 0
+        self.key = None
+        self.strip = None
+
+    def draw(self, display, value):
+        key = int(round(value * self.scale))
+        if key != self.key:
+            strip = None
+            for i in range(TEXT_CACHE_SIZE):
+                if self.keys[i] == key:
+                    strip = self.strips[i]
+                    break
+            if strip is None:
+                strip = self.render(key)
+            self.key = key
+            self.strip = strip
+        display.blit(self.strip, self.x, self.y, 0)
+
+    def render(self, key):
+        slot = self.next_slot
+        self.next_slot = (slot + 1) % TEXT_CACHE_SIZE
+        strip = self.strips[slot]
+        strip.fill(0)
+        strip.text(self.formatter(key / self.scale), 0, 0, 1)
+        self.keys[slot] = key
+        return strip
+
 def rescale(x, x_min, x_max, y_min, y_max):
     return (x - x_min) / (x_max - x_min) * (y_max - y_min) + y_min
 
@@ -55,6 +101,10 @@ class SimpleOceanSurge(EuroPiScript):
         self.t2 = 0.0
         self.cv1_val = 0.0
         self.cv2_val = 0.0
+        self.speed1_field = TextField(1, 1, 9, 100, lambda s: f"S1 {s:.2f}Hz")
+        self.speed2_field = TextField(1, CHAR_HEIGHT+2, 9, 100, lambda s: f"S2 {s:.2f}Hz")
+        self.cv1_field = TextField(1, 2*CHAR_HEIGHT+3, 10, 100, lambda v: f"CV1 {v:.2f}V")
+        self.cv2_field = TextField(1, 3*CHAR_HEIGHT+4, 10, 100, lambda v: f"CV2 {v:.2f}V")
 
     def main(self):
         while True:
@@ -87,10 +137,10 @@ class SimpleOceanSurge(EuroPiScript):
             cv2.voltage(self.cv2_val)
 
             ssoled.fill(0)
-            ssoled.text(f"S1 {speed1:.2f}Hz", 1, 1, 1)
-            ssoled.text(f"S2 {speed2:.2f}Hz", 1, CHAR_HEIGHT+2, 1)
-            ssoled.text(f"CV1 {self.cv1_val:.2f}V", 1, 2*CHAR_HEIGHT+3, 1)
-            ssoled.text(f"CV2 {self.cv2_val:.2f}V", 1, 3*CHAR_HEIGHT+4, 1)
+            self.speed1_field.draw(ssoled, speed1)
+            self.speed2_field.draw(ssoled, speed2)
+            self.cv1_field.draw(ssoled, self.cv1_val)
+            self.cv2_field.draw(ssoled, self.cv2_val)
             ssoled.show()
 
             time.sleep(dt)
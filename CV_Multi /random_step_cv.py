@@ -4,6 +4,8 @@ from europi import *
 from europi_script import EuroPiScript
 from experimental.knobs import *
 from experimental.screensaver import OledWithScreensaver
+import framebuf
+import math
 import random
 import time
 
@@ -15,16 +17,232 @@ FILTER_WINDOW = 5  # liczba próbek do uśredniania
 
 ssoled = OledWithScreensaver()
 
+# --- Pola tekstowe OLED z pamięcią zrasteryzowanych napisów ---
+TEXT_CACHE_SIZE = 4   # ile ostatnich wartości pola trzymamy zrasteryzowanych
+
+class TextField:
+    # Kluczem jest wartość po kwantyzacji (int), więc gdy nic się nie zmieniło,
+    # nie powstaje nowy napis ani nowa rasteryzacja, tylko blit gotowego paska.
+    # Paski to stała pula alokowana raz: nowa wartość nadpisuje najstarszy pasek.
+    def __init__(self, x, y, chars, scale, formatter):
+        self.x = x
+        self.y = y
+        self.width = chars * CHAR_WIDTH
+        self.scale = scale
+        self.formatter = formatter
+        self.strips = [
+            framebuf.FrameBuffer(bytearray(self.width * CHAR_HEIGHT // 8), self.width, CHAR_HEIGHT, framebuf.MONO_VLSB)
+            for _ in range(TEXT_CACHE_SIZE)
+        ]
+        self.keys = [None] * TEXT_CACHE_SIZE
+        self.next_slot = 0
+        self.key = None
+        self.strip = None
+
+    def draw(self, display, value):
+        key = int(round(value * self.scale))
+        if key != self.key:
+            strip = None
+            for i in range(TEXT_CACHE_SIZE):
+                if self.keys[i] == key:
+                    strip = self.strips[i]
+                    break
+            if strip is None:
+                strip = self.render(key)
+            self.key = key
+            self.strip = strip
+        display.blit(self.strip, self.x, self.y, 0)
+
+    def render(self, key):
+        slot = self.next_slot
+        self.next_slot = (slot + 1) % TEXT_CACHE_SIZE
+        strip = self.strips[slot]
+        strip.fill(0)
+        strip.text(self.formatter(key / self.scale), 0, 0, 1)
+        self.keys[slot] = key
+        return strip
+
+# --- Zegar kroków bez dryfu ---
+# Polityki nadrabiania zaległych kroków, gdy pętla nie nadąża
+CATCHUP_SKIP = 0     # jeden krok, pominięte terminy przepadają (siatka czasu zostaje)
+CATCHUP_BURST = 1    # każdy kolejny przebieg pętli odpala jeden zaległy krok
+CATCHUP_MAX_STEPS = 4  # przy większej zaległości BURST zachowuje się jak SKIP
+STEP_CATCHUP = CATCHUP_SKIP  # polityka używana przez ten skrypt
+
+class StepClock:
+    def __init__(self, frequency, policy=CATCHUP_SKIP):
+        self.policy = policy
+        self.period_ms = 1000.0 / frequency
+        # Początek bieżącego okresu: część całkowita w tickach + ułamek ms
+        self.anchor = time.ticks_ms()
+        self.anchor_frac = 0.0
+
+    def elapsed(self, now):
+        return time.ticks_diff(now, self.anchor) - self.anchor_frac
+
+    def phase(self, now):
+        p = self.elapsed(now) / self.period_ms
+        return p if p < 1.0 else 1.0
+
+    def set_frequency(self, frequency, now):
+        period_ms = 1000.0 / frequency
+        if period_ms == self.period_ms:
+            return
+        # Zmiana w trakcie okresu: zachowaj fazę, przeskaluj czas od początku okresu
+        self._set_anchor(now, self.elapsed(now) / self.period_ms * period_ms)
+        self.period_ms = period_ms
+
+    def poll(self, now):
+        # Termin przesuwa się o pełny okres (next = next + period), a nie do `now`,
+        # więc opóźnienie pętli nie kumuluje się w częstotliwości
+        elapsed = self.elapsed(now)
+        if elapsed < self.period_ms:
+            return False
+        due = int(elapsed / self.period_ms)
+        if self.policy == CATCHUP_BURST and due <= CATCHUP_MAX_STEPS:
+            self._advance(1)
+        else:
+            self._advance(due)
+        return True
+
+    def _advance(self, steps):
+        frac = self.anchor_frac + steps * self.period_ms
+        whole = int(frac)
+        self.anchor = time.ticks_add(self.anchor, whole)
+        self.anchor_frac = frac - whole
+
+    def _set_anchor(self, now, elapsed):
+        whole = math.ceil(elapsed)
+        self.anchor = time.ticks_add(now, -whole)
+        self.anchor_frac = whole - elapsed
+
+# --- Glide (slew) dla kroków losowych ---
+GLIDE_OFF = 0
+GLIDE_LIN = 1
+GLIDE_EXP = 2
+GLIDE_LOG = 3
+GLIDE_NAMES = [
+    "Off",
+    "Lin",
+    "Exp",
+    "Log"
+]
+GLIDE_POINTS = 32   # liczba punktów tablicy kształtu na jedno przejście
+GLIDE_CURVE = 4.0   # krzywizna Exp/Log
+
+def glide_shape(shape, x):
+    if shape == GLIDE_EXP:
+        # Szybki start i wolne dojście do celu (jak ładowanie RC)
+        return (1 - math.exp(-GLIDE_CURVE * x)) / (1 - math.exp(-GLIDE_CURVE))
+    elif shape == GLIDE_LOG:
+        # Wolny start i szybkie dojście do celu
+        return (math.exp(GLIDE_CURVE * x) - 1) / (math.exp(GLIDE_CURVE) - 1)
+    return x
+
+# Znormalizowane punkty kształtów (0..1), liczone raz przy starcie skryptu
+GLIDE_TABLES = [None] + [
+    [glide_shape(shape, i / GLIDE_POINTS) for i in range(GLIDE_POINTS + 1)]
+    for shape in (GLIDE_LIN, GLIDE_EXP, GLIDE_LOG)
+]
+
+class Glide:
+    def __init__(self, shape=GLIDE_OFF, amount=0.0):
+        self.shape = shape
+        self.amount = amount    # czas przejścia jako ułamek okresu kroku
+        self.value = 0.0
+        self.target = 0.0
+        # Odcinki łamanej: przyrost na próbkę i liczba próbek w odcinku
+        self.incs = [0.0] * GLIDE_POINTS
+        self.counts = [0] * GLIDE_POINTS
+        self.segments = 0
+        self.seg = 0
+        self.inc = 0.0
+        self.left = 0
+        # Tempo próbkowania mierzone liczbą wywołań update() między krokami
+        self.samples = 0
+        self.start_at = None
+
+    def start(self, target, period_ms, now):
+        self.target = target
+        # Ile próbek przypada na 1 ms, z poprzedniego kroku
+        samples_per_ms = 0.0
+        if self.start_at is not None:
+            elapsed = time.ticks_diff(now, self.start_at)
+            if elapsed > 0:
+                samples_per_ms = self.samples / elapsed
+        self.samples = 0
+        self.start_at = now
+        n = int(self.amount * period_ms * samples_per_ms)
+        if self.shape == GLIDE_OFF or n < 1:
+            self.value = target
+            self.left = 0
+            return
+        # Interpolacja liniowa między punktami tablicy; przy mniejszej liczbie
+        # próbek niż punktów sąsiednie odcinki łączą się w jeden
+        delta = target - self.value
+        table = GLIDE_TABLES[self.shape]
+        segments = n if n < GLIDE_POINTS else GLIDE_POINTS
+        incs = self.incs
+        counts = self.counts
+        for j in range(segments):
+            a = j * GLIDE_POINTS // segments
+            b = (j + 1) * GLIDE_POINTS // segments
+            count = (j + 1) * n // segments - j * n // segments
+            counts[j] = count
+            incs[j] = (table[b] - table[a]) * delta / count
+        self.segments = segments
+        self.seg = 0
+        self.inc = incs[0]
+        self.left = counts[0]
+
+    def update(self):
+        # Jedna próbka to jedno dodawanie; tablice przelicza tylko start()
+        self.samples += 1
+        if self.left:
+            self.value += self.inc
+            self.left -= 1
+            if self.left == 0:
+                seg = self.seg + 1
+                if seg < self.segments:
+                    self.seg = seg
+                    self.inc = self.incs[seg]
+                    self.left = self.counts[seg]
+                else:
+                    self.value = self.target
+        return self.value
+
 class RandomStepCV(EuroPiScript):
     def __init__(self):
         super().__init__()
+        cfg = self.load_state_json()
         self.freq_knob = KnobBank.builder(k1).with_unlocked_knob("freq").build()
+        self.glide_knob = KnobBank.builder(k2).with_unlocked_knob("glide").build()
         # Bufor do uśredniania wartości potencjometru
         start_val = self.freq_knob["freq"].percent()
         self.freq_buffer = [start_val] * FILTER_WINDOW
-        self.last_tick = time.ticks_ms()
         self.current_voltage = 0.0
         self.freq = MIN_FREQUENCY  # inicjacja
+        self.clock = StepClock(self.freq, STEP_CATCHUP)
+        self.glide = Glide(cfg.get("glide_shape", GLIDE_OFF))
+        self.output_voltage = 0.0
+        self.settings_dirty = False
+        self.freq_field = TextField(1, 1, 9, 100, lambda f: f"F {f:.2f}Hz")
+        self.voltage_field = TextField(1, CHAR_HEIGHT+2, 8, 100, lambda v: f"V {v:.2f}V")
+        self.glide_field = TextField(1, 2*CHAR_HEIGHT+3, 5, 1, lambda i: f"G {GLIDE_NAMES[int(i)]}")
+        self.amount_field = TextField(1 + 6*CHAR_WIDTH, 2*CHAR_HEIGHT+3, 4, 100, lambda a: f"{a:.2f}")
+
+        @b1.handler
+        def on_b1_press():
+            self.glide.shape = (self.glide.shape + 1) % len(GLIDE_NAMES)
+            self.settings_dirty = True
+            ssoled.notify_user_interaction()
+
+    def save(self):
+        cfg = {
+            "glide_shape": self.glide.shape
+        }
+        self.save_state_json(cfg)
+        self.settings_dirty = False
 
     def main(self):
         while True:
@@ -33,20 +251,29 @@ class RandomStepCV(EuroPiScript):
             self.freq_buffer.append(self.freq_knob["freq"].percent())
             smoothed_percent = sum(self.freq_buffer) / len(self.freq_buffer)
             self.freq = smoothed_percent * (MAX_FREQUENCY - MIN_FREQUENCY) + MIN_FREQUENCY
-            period_ms = 1000.0 / self.freq
 
-            now = time.ticks_ms()
-            elapsed = time.ticks_diff(now, self.last_tick)
+            # Czas glide jako ułamek okresu kroku
+            self.glide.amount = self.glide_knob["glide"].percent()
 
-            if elapsed >= period_ms:
+            now = time.ticks_ms()
+            self.clock.set_frequency(self.freq, now)
+            if self.clock.poll(now):
                 self.current_voltage = random.uniform(MIN_VOLTAGE, MAX_VOLTAGE)
-                cv1.voltage(self.current_voltage)
-                self.last_tick = now
+                self.glide.start(self.current_voltage, self.clock.period_ms, now)
+            v = self.glide.update()
+            if v != self.output_voltage:
+                self.output_voltage = v
+                cv1.voltage(v)
+
+            if self.settings_dirty:
+                self.save()
 
-            # OLED: tylko freq i napięcie
+            # OLED: freq, napięcie docelowe i glide
             ssoled.fill(0)
-            ssoled.text(f"F {self.freq:.2f}Hz", 1, 1, 1)
-            ssoled.text(f"V {self.current_voltage:.2f}V", 1, CHAR_HEIGHT+2, 1)
+            self.freq_field.draw(ssoled, self.freq)
+            self.voltage_field.draw(ssoled, self.current_voltage)
+            self.glide_field.draw(ssoled, self.glide.shape)
+            self.amount_field.draw(ssoled, self.glide.amount)
             ssoled.show()
 
 if __name__ == "__main__":
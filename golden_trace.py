@@ -0,0 +1,697 @@
+#!/usr/bin/env python3
+# Golden trace: nagrywanie i odtwarzanie wejść/wyjść skryptu na wirtualnym EuroPi.
+#
+# Nagrywanie uruchamia skrypt na wirtualnej płytce z wirtualnym zegarem,
+# podaje mu scenariusz wejść (zbocza zegara, ruchy gałek, przyciski, seed)
+# i zapisuje próbki napięć cv1..cv6 do pliku śladu. Odtwarzanie podaje te same
+# wejścia nowej wersji kodu, porównuje wyjścia z tolerancją i podaje
+# przepustowość (pętle/s, krotność czasu rzeczywistego).
+#
+#   python golden_trace.py record "CV_Multi /random_step_cv.py" random_step.trace --knob-moves 8
+#   python golden_trace.py replay "CV_Multi /random_step_cv.py" random_step.trace
+#
+# Ślady referencyjne skryptów leżą w traces/ (odtwarzać z katalogu głównego repo):
+#   python golden_trace.py replay traces/bezier_single_cv.trace
+# Ślady BitGarden nagrywamy scenariuszem edycji menu (b2 + k2), nie ogólnym scenariuszem CV:
+#   python golden_trace.py record 3_way_seq.py traces/3_way_seq.trace --clock-ms 250 --edits 12 --duration 20000
+#
+# Tempo zegara kroków (StepClock) sprawdzamy osobno, z jitterem pętli i zmianą częstotliwości:
+#   python golden_trace.py rate "CV_Multi /random_step_cv.py"
+#
+# Czas wirtualny płynie tylko w time.sleep*/utime.sleep* i oled.show() (FRAME_MS),
+# więc wynik nie zależy od szybkości maszyny, na której działa test.
+
+import argparse
+import json
+import random
+import sys
+import time as walltime
+import types
+
+TRACE_VERSION = 1
+OUTPUT_COUNT = 6
+FRAME_MS = 20           # czas wirtualny jednego oled.show()
+SAMPLE_MS = 10          # co ile ms próbkujemy wyjścia
+GATE_MS = 10            # długość impulsu zegara na din
+PRESS_MS = 50           # długość wciśnięcia przycisku
+EDIT_SWEEP_STEPS = 8    # ile ruchów k2 w trakcie jednej edycji
+EDIT_STEP_MS = 150      # odstęp między ruchami k2 w trakcie edycji
+RATE_DURATION_MS = 120000
+RATE_JITTER_MS = (1, 40)    # losowy czas jednego przebiegu pętli
+RATE_STALL_MS = 250         # przestój pętli w scenariuszu przeciążenia
+RATE_STALL_EVERY = 50       # co ile przebiegów pętli przestój
+RATE_CASES = [              # (częstotliwość, częstotliwość po zmianie w połowie okresu)
+    (3.0, 3.0),
+    (0.37, 7.3),
+    (9.7, 0.5),
+    (1.0, 10.0),
+]
+DEFAULT_TOLERANCE = 0.01
+MAX_OUTPUT_VOLTAGE = 10.0
+
+
+class TraceFinished(Exception):
+    pass
+
+
+# -------- Wirtualny zegar --------
+class VirtualClock:
+    def __init__(self, session):
+        self.session = session
+        self.now = 0
+
+    def ticks_ms(self):
+        return self.now
+
+    def ticks_us(self):
+        return self.now * 1000
+
+    def ticks_add(self, ticks, delta):
+        return ticks + delta
+
+    def ticks_diff(self, a, b):
+        return a - b
+
+    def time(self):
+        return self.now / 1000
+
+    def sleep(self, seconds):
+        self.session.advance(int(seconds * 1000))
+
+    def sleep_ms(self, ms):
+        self.session.advance(int(ms))
+
+    def sleep_us(self, us):
+        self.session.advance(int(us // 1000))
+
+
+# -------- Wirtualna płytka --------
+class VirtualKnob:
+    def __init__(self, position=0.5):
+        self.position = position
+
+    def percent(self, *args, **kwargs):
+        return self.position
+
+    def value(self, *args, **kwargs):
+        return self.position
+
+    def range(self, steps=100, *args, **kwargs):
+        return min(int(self.position * steps), steps - 1)
+
+    def read_position(self, steps=100, *args, **kwargs):
+        return self.range(steps)
+
+    def choice(self, values, *args, **kwargs):
+        return values[self.range(len(values))]
+
+
+class VirtualDigital:
+    # Przycisk albo wejście cyfrowe: poziom + handlery zboczy
+    def __init__(self):
+        self.level = 0
+        self.rising = None
+        self.falling = None
+        self.last_rising_ms = 0
+
+    def value(self):
+        return self.level
+
+    def handler(self, func):
+        self.rising = func
+        return func
+
+    def handler_falling(self, func):
+        self.falling = func
+        return func
+
+    def last_triggered(self):
+        return self.last_rising_ms
+
+    def set(self, level, now):
+        level = 1 if level else 0
+        if level == self.level:
+            return
+        self.level = level
+        if level:
+            self.last_rising_ms = now
+            if self.rising:
+                self.rising()
+        elif self.falling:
+            self.falling()
+
+
+class VirtualAnalogue:
+    def __init__(self):
+        self.volts = 0.0
+
+    def read_voltage(self, *args, **kwargs):
+        return self.volts
+
+    def percent(self, *args, **kwargs):
+        return self.volts / MAX_OUTPUT_VOLTAGE
+
+
+class VirtualOutput:
+    def __init__(self):
+        self.volts = 0.0
+
+    def voltage(self, v=None):
+        if v is None:
+            return self.volts
+        # Jak sprzęt: napięcie ograniczone do zakresu wyjścia
+        self.volts = max(0.0, min(MAX_OUTPUT_VOLTAGE, v))
+
+    def on(self):
+        self.volts = 5.0
+
+    def off(self):
+        self.volts = 0.0
+
+    def value(self, v=None):
+        if v is None:
+            return 1 if self.volts > 0 else 0
+        self.volts = 5.0 if v else 0.0
+
+
+class VirtualDisplay:
+    # Rysowanie jest ignorowane; show() to granica klatki w czasie wirtualnym
+    width = 128
+    height = 32
+
+    def __init__(self, session):
+        self.session = session
+
+    def show(self):
+        self.session.frames += 1
+        self.session.advance(FRAME_MS)
+
+    def text(self, *args, **kwargs):
+        self.session.rasterized += 1
+
+    def _draw(self, *args, **kwargs):
+        pass
+
+    fill = pixel = hline = vline = line = rect = fill_rect = _draw
+    blit = scroll = centre_text = invert = contrast = _draw
+
+
+class VirtualFrameBuffer:
+    # framebuf.FrameBuffer: liczy rasteryzacje tekstu i alokacje buforów,
+    # reszta rysowania jest pomijana
+    def __init__(self, buffer, width, height, format, *args):
+        self.width = width
+        self.height = height
+        session = Session.current
+        if session.loops > 0:
+            # Alokacje po starcie pętli to śmieci dla GC na płytce
+            session.loop_framebuffers += 1
+            session.loop_buffer_bytes += len(buffer)
+
+    def text(self, *args, **kwargs):
+        Session.current.rasterized += 1
+
+    def _draw(self, *args, **kwargs):
+        pass
+
+    fill = pixel = hline = vline = line = rect = fill_rect = blit = scroll = _draw
+
+
+class VirtualOledWithScreensaver:
+    def __init__(self, enable_screensaver=True):
+        pass
+
+    def notify_user_interaction(self):
+        pass
+
+    def __getattr__(self, name):
+        return getattr(Session.current.oled, name)
+
+
+class VirtualKnobBank:
+    def __init__(self, knob, names):
+        self.knob = knob
+        self.names = names
+        self.index = 0
+
+    @staticmethod
+    def builder(knob):
+        return VirtualKnobBankBuilder(knob)
+
+    def __getitem__(self, name):
+        return self.knob
+
+    @property
+    def current(self):
+        return self.knob
+
+    def next(self):
+        self.index = (self.index + 1) % len(self.names)
+
+
+class VirtualKnobBankBuilder:
+    def __init__(self, knob):
+        self.knob = knob
+        self.names = []
+
+    def with_locked_knob(self, name, *args, **kwargs):
+        self.names.append(name)
+        return self
+
+    def with_unlocked_knob(self, name, *args, **kwargs):
+        self.names.append(name)
+        return self
+
+    def build(self):
+        return VirtualKnobBank(self.knob, self.names)
+
+
+class VirtualEuroPiScript:
+    def __init__(self):
+        pass
+
+    def load_state_json(self):
+        return dict(Session.current.state)
+
+    def save_state_json(self, state):
+        Session.current.state = dict(state)
+
+
+def solve_linear_system(m):
+    # Eliminacja Gaussa z wyborem elementu głównego; m to macierz rozszerzona n x (n+1)
+    n = len(m)
+    m = [list(row) for row in m]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(m[r][col]))
+        m[col], m[pivot] = m[pivot], m[col]
+        for r in range(n):
+            if r != col and m[col][col] != 0:
+                f = m[r][col] / m[col][col]
+                for c in range(col, n + 1):
+                    m[r][c] -= f * m[col][c]
+    return [m[i][n] / m[i][i] if m[i][i] != 0 else 0.0 for i in range(n)]
+
+
+# -------- Sesja: wirtualna płytka + scenariusz + próbki --------
+class Session:
+    current = None
+
+    def __init__(self, events, duration, sample_ms=SAMPLE_MS, state=None):
+        self.events = sorted(events, key=lambda e: e[0])
+        self.next_event = 0
+        self.duration = duration
+        self.sample_ms = sample_ms
+        self.state = dict(state or {})
+        self.clock = VirtualClock(self)
+        self.inputs = {
+            "k1": VirtualKnob(),
+            "k2": VirtualKnob(),
+            "b1": VirtualDigital(),
+            "b2": VirtualDigital(),
+            "din": VirtualDigital(),
+            "ain": VirtualAnalogue(),
+        }
+        self.outputs = [VirtualOutput() for _ in range(OUTPUT_COUNT)]
+        self.oled = VirtualDisplay(self)
+        self.samples = []
+        self.next_sample = 0
+        self.loops = 0
+        self.frames = 0
+        self.rasterized = 0
+        self.loop_framebuffers = 0
+        self.loop_buffer_bytes = 0
+
+    def modules(self):
+        europi = types.ModuleType("europi")
+        europi.__dict__.update(self.inputs)
+        for i, out in enumerate(self.outputs):
+            setattr(europi, f"cv{i + 1}", out)
+        europi.cvs = list(self.outputs)
+        europi.oled = self.oled
+        europi.OLED_WIDTH = VirtualDisplay.width
+        europi.OLED_HEIGHT = VirtualDisplay.height
+        europi.CHAR_WIDTH = 8
+        europi.CHAR_HEIGHT = 8
+        europi.MAX_OUTPUT_VOLTAGE = MAX_OUTPUT_VOLTAGE
+
+        europi_script = types.ModuleType("europi_script")
+        europi_script.EuroPiScript = VirtualEuroPiScript
+
+        experimental = types.ModuleType("experimental")
+        knobs = types.ModuleType("experimental.knobs")
+        knobs.KnobBank = VirtualKnobBank
+        math_extras = types.ModuleType("experimental.math_extras")
+        math_extras.solve_linear_system = solve_linear_system
+        screensaver = types.ModuleType("experimental.screensaver")
+        screensaver.OledWithScreensaver = VirtualOledWithScreensaver
+        experimental.knobs = knobs
+        experimental.math_extras = math_extras
+        experimental.screensaver = screensaver
+
+        fb = types.ModuleType("framebuf")
+        fb.FrameBuffer = VirtualFrameBuffer
+        fb.MONO_VLSB = 0
+        fb.MONO_HLSB = 3
+        fb.MONO_HMSB = 4
+
+        clock = types.ModuleType("time")
+        for name in ("ticks_ms", "ticks_us", "ticks_add", "ticks_diff", "time", "sleep", "sleep_ms", "sleep_us"):
+            setattr(clock, name, getattr(self.clock, name))
+
+        return {
+            "europi": europi,
+            "europi_script": europi_script,
+            "experimental": experimental,
+            "experimental.knobs": knobs,
+            "experimental.math_extras": math_extras,
+            "experimental.screensaver": screensaver,
+            "configuration": types.ModuleType("configuration"),
+            "framebuf": fb,
+            "time": clock,
+            "utime": clock,
+        }
+
+    def apply_events(self):
+        now = self.clock.now
+        while self.next_event < len(self.events) and self.events[self.next_event][0] <= now:
+            _, name, value = self.events[self.next_event]
+            self.next_event += 1
+            device = self.inputs[name]
+            if isinstance(device, VirtualKnob):
+                device.position = value
+            elif isinstance(device, VirtualAnalogue):
+                device.volts = value
+            else:
+                device.set(value, now)
+
+    def advance(self, ms):
+        # Granica pętli skryptu: próbki do nowej chwili, przesunięcie zegara, wejścia
+        self.loops += 1
+        target = self.clock.now + max(ms, 1)
+        volts = tuple(round(out.volts, 3) for out in self.outputs)
+        while self.next_sample <= target and self.next_sample < self.duration:
+            self.samples.append((self.next_sample, volts))
+            self.next_sample += self.sample_ms
+        self.clock.now = target
+        if target >= self.duration:
+            raise TraceFinished()
+        self.apply_events()
+
+
+def load_script(path, session):
+    with open(path) as f:
+        source = f.read()
+    module = types.ModuleType("golden_trace_script")
+    module.__file__ = path
+    saved = {name: sys.modules.get(name) for name in session.modules()}
+    sys.modules.update(session.modules())
+    try:
+        exec(compile(source, path, "exec"), module.__dict__)
+    finally:
+        for name, previous in saved.items():
+            if previous is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = previous
+    return module
+
+
+def find_script_class(module, name=None):
+    if name:
+        return getattr(module, name)
+    for value in module.__dict__.values():
+        if (isinstance(value, type) and issubclass(value, VirtualEuroPiScript)
+                and value is not VirtualEuroPiScript and hasattr(value, "main")):
+            return value
+    raise ValueError("w skrypcie nie ma klasy EuroPiScript z metodą main()")
+
+
+def run(path, events, duration, seed, sample_ms=SAMPLE_MS, state=None, class_name=None):
+    session = Session(events, duration, sample_ms, state)
+    Session.current = session
+    random.seed(seed)
+    started = walltime.perf_counter()
+    try:
+        session.apply_events()
+        module = load_script(path, session)
+        script = find_script_class(module, class_name)()
+        script.main()
+    except TraceFinished:
+        pass
+    finally:
+        Session.current = None
+    session.wall_s = walltime.perf_counter() - started
+    return session
+
+
+# -------- Scenariusz wejść --------
+def generate_events(seed, duration, clock_ms=0, knob_moves=0, presses=0, edits=0):
+    rng = random.Random(seed)
+    events = [(0, "k1", 0.5), (0, "k2", 0.5)]
+    if clock_ms > 0:
+        for t in range(clock_ms, duration, clock_ms):
+            events.append((t, "din", 1))
+            events.append((t + GATE_MS, "din", 0))
+    for _ in range(knob_moves):
+        events.append((rng.randrange(duration), rng.choice(["k1", "k2"]), round(rng.random(), 3)))
+    for _ in range(presses):
+        t = rng.randrange(duration)
+        button = rng.choice(["b1", "b2"])
+        events.append((t, button, 1))
+        events.append((t + PRESS_MS, button, 0))
+    # Edycje menu: k2 wybiera pozycję, b2 wchodzi w edycję, k2 przesuwa się
+    # powoli w trakcie edycji, b2 zatwierdza. Edycje idą po kolei, bez nakładania.
+    edit_ms = (EDIT_SWEEP_STEPS + 3) * EDIT_STEP_MS
+    t = EDIT_STEP_MS
+    for _ in range(edits):
+        if t + edit_ms >= duration:
+            break
+        events.append((t, "k2", round(rng.random(), 3)))
+        t += EDIT_STEP_MS
+        events.append((t, "b2", 1))
+        events.append((t + PRESS_MS, "b2", 0))
+        start = rng.random()
+        end = rng.random()
+        for i in range(1, EDIT_SWEEP_STEPS + 1):
+            t += EDIT_STEP_MS
+            events.append((t, "k2", round(start + (end - start) * i / EDIT_SWEEP_STEPS, 3)))
+        t += EDIT_STEP_MS
+        events.append((t, "b2", 1))
+        events.append((t + PRESS_MS, "b2", 0))
+        t += EDIT_STEP_MS + rng.randrange(duration // max(edits, 1) // 2 + 1)
+    return sorted(events, key=lambda e: e[0])
+
+
+# -------- Plik śladu --------
+def write_trace(path, header, events, samples):
+    with open(path, "w") as f:
+        f.write(f"# golden-trace {TRACE_VERSION}\n")
+        f.write("H " + json.dumps(header, sort_keys=True) + "\n")
+        for t, name, value in events:
+            f.write(f"E {t} {name} {value}\n")
+        # Tylko próbki różne od poprzedniej; przy odczycie wartość jest podtrzymywana
+        previous = None
+        for t, volts in samples:
+            if volts != previous:
+                f.write(f"S {t} " + " ".join(f"{v:.3f}" for v in volts) + "\n")
+                previous = volts
+
+
+def read_trace(path):
+    header = None
+    events = []
+    changes = []
+    with open(path) as f:
+        for line in f:
+            parts = line.split()
+            if not parts or parts[0] == "#":
+                continue
+            if parts[0] == "H":
+                header = json.loads(line[2:])
+            elif parts[0] == "E":
+                value = float(parts[3]) if parts[2] in ("k1", "k2", "ain") else int(parts[3])
+                events.append((int(parts[1]), parts[2], value))
+            elif parts[0] == "S":
+                changes.append((int(parts[1]), tuple(float(v) for v in parts[2:])))
+    if header is None:
+        raise ValueError(f"{path}: brak nagłówka śladu")
+    samples = []
+    volts = (0.0,) * OUTPUT_COUNT
+    i = 0
+    for t in range(0, header["duration"], header["sample_ms"]):
+        while i < len(changes) and changes[i][0] <= t:
+            volts = changes[i][1]
+            i += 1
+        samples.append((t, volts))
+    return header, events, samples
+
+
+def compare(expected, actual, tolerance):
+    max_error = [0.0] * OUTPUT_COUNT
+    mismatches = 0
+    first = None
+    for (t, want), (_, got) in zip(expected, actual):
+        bad = False
+        for ch in range(OUTPUT_COUNT):
+            error = abs(want[ch] - got[ch])
+            if error > max_error[ch]:
+                max_error[ch] = error
+            if error > tolerance:
+                bad = True
+        if bad:
+            mismatches += 1
+            if first is None:
+                first = (t, want, got)
+    if len(expected) != len(actual):
+        mismatches += abs(len(expected) - len(actual))
+    return max_error, mismatches, first
+
+
+def report_throughput(session, duration):
+    wall = max(session.wall_s, 1e-9)
+    print(f"czas: {session.wall_s * 1000:.1f} ms dla {duration / 1000:.1f} s wirtualnych "
+          f"({duration / 1000 / wall:.1f}x czasu rzeczywistego)")
+    print(f"pętle: {session.loops} ({session.loops / wall:.0f}/s), klatki OLED: {session.frames}, "
+          f"rasteryzacje tekstu: {session.rasterized}")
+    print(f"alokacje w pętli: FrameBuffer {session.loop_framebuffers}, "
+          f"bufory {session.loop_buffer_bytes} B")
+
+
+# -------- Kontrola tempa StepClock na wirtualnym zegarze --------
+def count_steps(step_clock_cls, clock, policy, f1, f2, seed, stall):
+    rng = random.Random(seed)
+    clock.now = 0
+    step_clock = step_clock_cls(f1, policy)
+    # Zmiana częstotliwości wypada w połowie czasu, zwykle w środku okresu
+    change_at = RATE_DURATION_MS // 2 + rng.randrange(int(1000 / f1))
+    freq = f1
+    switched = None
+    steps = 0
+    loops = 0
+    while True:
+        loops += 1
+        dt = rng.randint(*RATE_JITTER_MS)
+        # Bez przestojów przy końcu, żeby zaległość zdążyła się odrobić
+        if stall and loops % RATE_STALL_EVERY == 0 and clock.now < RATE_DURATION_MS - 2000:
+            dt += RATE_STALL_MS
+        if clock.now + dt > RATE_DURATION_MS:
+            break
+        clock.now += dt
+        if switched is None and clock.now >= change_at:
+            # Skrypt widzi nową częstotliwość dopiero w tej iteracji pętli
+            switched = clock.now
+            freq = f2
+        step_clock.set_frequency(freq, clock.now)
+        if step_clock.poll(clock.now):
+            steps += 1
+    end = clock.now
+    # Oczekiwana liczba kroków: faza ciągła przez zmianę częstotliwości
+    change = end if switched is None else switched
+    expected = int(change * f1 / 1000 + (end - change) * f2 / 1000)
+    return steps, expected
+
+
+def cmd_rate(args):
+    session = Session([], RATE_DURATION_MS)
+    Session.current = session
+    try:
+        module = load_script(args.script, session)
+    finally:
+        Session.current = None
+    step_clock_cls = module.StepClock
+    failures = 0
+    for policy, name in ((module.CATCHUP_SKIP, "SKIP"), (module.CATCHUP_BURST, "BURST")):
+        for stall in (False, True):
+            for f1, f2 in RATE_CASES:
+                steps, expected = count_steps(step_clock_cls, session.clock, policy, f1, f2, args.seed, stall)
+                # Przy przestojach SKIP z założenia gubi kroki; BURST musi je odrobić
+                if stall and name == "SKIP":
+                    ok = steps <= expected + 1
+                else:
+                    ok = abs(steps - expected) <= 1
+                failures += 0 if ok else 1
+                print(f"{name:5} {'przestoje' if stall else 'jitter':9} {f1:5.2f}->{f2:5.2f} Hz: "
+                      f"{steps} kroków, oczekiwane {expected} {'OK' if ok else 'BŁĄD'}")
+    if failures:
+        print(f"NIEZGODNOŚĆ: {failures} przypadków poza tolerancją 1 kroku")
+        return 1
+    print("OK: tempo StepClock zgodne z częstotliwością")
+    return 0
+
+
+def cmd_record(args):
+    if args.scenario:
+        _, events, _ = read_trace(args.scenario)
+    else:
+        events = generate_events(args.seed, args.duration, args.clock_ms, args.knob_moves, args.presses, args.edits)
+    session = run(args.script, events, args.duration, args.seed, args.sample_ms, class_name=args.cls)
+    header = {
+        "script": args.script,
+        "class": args.cls,
+        "seed": args.seed,
+        "duration": args.duration,
+        "sample_ms": args.sample_ms,
+    }
+    write_trace(args.trace, header, events, session.samples)
+    print(f"zapisano {len(session.samples)} próbek i {len(events)} zdarzeń do {args.trace}")
+    report_throughput(session, args.duration)
+    return 0
+
+
+def cmd_replay(args):
+    header, events, expected = read_trace(args.trace)
+    best = None
+    for _ in range(args.repeat):
+        session = run(args.script or header["script"], events, header["duration"], header["seed"],
+                      header["sample_ms"], class_name=header.get("class"))
+        if best is None or session.wall_s < best.wall_s:
+            best = session
+    max_error, mismatches, first = compare(expected, best.samples, args.tolerance)
+    print("maks. błąd [V]: " + " ".join(f"cv{ch + 1}={e:.3f}" for ch, e in enumerate(max_error)))
+    report_throughput(best, header["duration"])
+    if mismatches:
+        t, want, got = first
+        print(f"NIEZGODNOŚĆ: {mismatches} próbek poza tolerancją {args.tolerance} V, pierwsza przy {t} ms")
+        print(f"  oczekiwane: {want}")
+        print(f"  otrzymane:  {got}")
+        return 1
+    print("OK: wyjścia zgodne ze śladem")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Nagrywanie/odtwarzanie śladów wyjść skryptów EuroPi")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    rec = sub.add_parser("record", help="uruchom skrypt ze scenariuszem i zapisz ślad")
+    rec.add_argument("script")
+    rec.add_argument("trace")
+    rec.add_argument("--class", dest="cls", default=None, help="klasa skryptu (domyślnie pierwsza EuroPiScript)")
+    rec.add_argument("--seed", type=int, default=1)
+    rec.add_argument("--duration", type=int, default=10000, help="czas wirtualny [ms]")
+    rec.add_argument("--sample-ms", type=int, default=SAMPLE_MS)
+    rec.add_argument("--clock-ms", type=int, default=0, help="okres zegara na din [ms], 0 = brak")
+    rec.add_argument("--knob-moves", type=int, default=0)
+    rec.add_argument("--presses", type=int, default=0)
+    rec.add_argument("--edits", type=int, default=0, help="edycje menu: b2, ruchy k2, b2")
+    rec.add_argument("--scenario", default=None, help="weź zdarzenia z innego pliku śladu")
+    rec.set_defaults(func=cmd_record)
+
+    rep = sub.add_parser("replay", help="odtwórz wejścia ze śladu i porównaj wyjścia")
+    rep.add_argument("script", nargs="?", default=None, help="domyślnie skrypt zapisany w śladzie")
+    rep.add_argument("trace")
+    rep.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="dopuszczalny błąd [V]")
+    rep.add_argument("--repeat", type=int, default=1, help="powtórzenia do pomiaru czasu (bierzemy najszybsze)")
+    rep.set_defaults(func=cmd_replay)
+
+    rate = sub.add_parser("rate", help="sprawdź tempo StepClock skryptu na wirtualnym zegarze z jitterem")
+    rate.add_argument("script")
+    rate.add_argument("--seed", type=int, default=1)
+    rate.set_defaults(func=cmd_rate)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())